@@ -0,0 +1,312 @@
+"""File ingest.py with readers of the columnar uploads
+
+The readers load the pool and the characteristics straight into NumPy
+buffers, so the values are not validated cell by cell by pydantic.
+Every reader returns a tuple `(pool, characteristics)` where `pool` is
+a 1D array of unit identifiers (as strings) and `characteristics` is a
+2D array of shape (number of characteristics, number of units).
+"""
+import csv
+import io
+import os
+import numpy as np
+import orjson
+
+from .schemas import MAX_UPLOAD_BYTES, MAX_UPLOAD_POOL_SIZE
+
+FORMATS = ("csv", "ndjson", "parquet")
+CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "application/vnd.apache.parquet": "parquet",
+    "application/x-parquet": "parquet",
+}
+EXTENSIONS = {
+    ".csv": "csv",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+}
+
+
+class UploadError(Exception):
+    """Exception raised when the uploaded file cannot be read."""
+
+    def __init__(self, msg, type="INVALID UPLOAD", ctx=None):
+        self.msg = msg
+        self.type = type
+        self.ctx = ctx
+        super().__init__(self.msg)
+
+
+def detect_format(filename=None, content_type=None, format=None):
+    """Function to detect the format of the uploaded file.
+
+    Args:
+        filename (str): The name of the uploaded file.
+        content_type (str): The content type of the uploaded file.
+        format (str): The explicitly requested format. (default is None)
+
+    Returns:
+        str: One of `csv`, `ndjson` or `parquet`.
+    """
+
+    if format is not None:
+        if format not in FORMATS:
+            raise UploadError(
+                f"Unsupported format: {format}",
+                type="UNSUPPORTED FORMAT",
+                ctx={"supported": list(FORMATS)}
+            )
+        return format
+
+    if content_type is not None:
+        detected = CONTENT_TYPES.get(content_type.split(";")[0].strip().lower())
+        if detected is not None:
+            return detected
+
+    if filename is not None:
+        extension = os.path.splitext(filename)[1].lower()
+        if extension in EXTENSIONS:
+            return EXTENSIONS[extension]
+
+    raise UploadError(
+        "Unable to detect the format of the uploaded file.",
+        type="UNSUPPORTED FORMAT",
+        ctx={"supported": list(FORMATS)}
+    )
+
+
+def check_size(file, max_bytes=MAX_UPLOAD_BYTES):
+    """Function to check the size of the uploaded file without reading it.
+
+    The check runs after the upload has been received, requests announcing a larger
+    `Content-Length` are rejected before by the middleware of the app.
+
+    Args:
+        file (file-like): A seekable binary file.
+        max_bytes (int): The maximal allowed size in bytes.
+
+    Returns:
+        int: The size of the file in bytes.
+    """
+
+    file.seek(0, io.SEEK_END)
+    size = file.tell()
+    file.seek(0)
+
+    if size > max_bytes:
+        raise UploadError(
+            f"The uploaded file is too large ({size} bytes).",
+            type="UPLOAD TOO LARGE",
+            ctx={"maxSize": {"bytes": max_bytes}}
+        )
+
+    return size
+
+
+def read_csv(file, unit_column="unit", delimiter=","):
+    """Function to read a CSV file with a header row.
+
+    Values may be quoted with `"`, e.g. a unit identifier containing the delimiter.
+    The file is decoded as UTF-8 with an optional byte order mark.
+
+    Args:
+        file (file-like): A seekable binary file.
+        unit_column (str): The name of the column with unit identifiers.
+            If the column is missing, units are numbered from 0. (default is "unit")
+        delimiter (str): The delimiter of the columns. (default is ",")
+
+    Returns:
+        tuple: The pool and the characteristics.
+    """
+
+    # `utf-8-sig` drops the byte order mark written by spreadsheet exports
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+
+    try:
+        header = [name.strip() for name in next(csv.reader([text.readline()], delimiter=delimiter), [])]
+        unit_idx = header.index(unit_column) if unit_column in header else None
+        char_idx = [idx for idx in range(len(header)) if idx != unit_idx]
+
+        if len(char_idx) == 0:
+            raise UploadError("The uploaded file does not contain any characteristics.")
+
+        # Numeric columns are parsed by the C reader of NumPy in a single pass
+        start = text.tell()
+        try:
+            characteristics = np.loadtxt(
+                text, delimiter=delimiter, quotechar='"', usecols=char_idx, dtype=np.float64, ndmin=2
+            ).T
+        except ValueError as e:
+            raise UploadError(f"Invalid characteristics value: {e}")
+
+        if unit_idx is None:
+            pool = np.arange(characteristics.shape[1]).astype(str)
+        else:
+            text.seek(start)
+            pool = np.loadtxt(
+                text, delimiter=delimiter, quotechar='"', usecols=unit_idx, dtype=str, ndmin=1
+            )
+    finally:
+        # Do not close the underlying upload together with the wrapper
+        text.detach()
+
+    return pool, np.ascontiguousarray(characteristics)
+
+
+def read_ndjson(file, unit_column="unit"):
+    """Function to read a newline delimited JSON file with one unit per line.
+
+    Every line is an object, e.g. `{"unit": "A", "visits": 4, "sales": 5}`.
+    The characteristics are taken from the keys of the first line.
+
+    Args:
+        file (file-like): A seekable binary file.
+        unit_column (str): The key with unit identifiers.
+            If the key is missing, units are numbered from 0. (default is "unit")
+
+    Returns:
+        tuple: The pool and the characteristics.
+    """
+
+    units = []
+    columns = None
+    values = []
+
+    for line_no, line in enumerate(file, start=1):
+
+        if not line.strip():
+            continue
+
+        try:
+            record = orjson.loads(line)
+        except orjson.JSONDecodeError as e:
+            raise UploadError(f"Invalid JSON on line {line_no}: {e}")
+
+        if not isinstance(record, dict):
+            raise UploadError(f"Line {line_no} is not an object.")
+
+        if columns is None:
+            columns = [key for key in record if key != unit_column]
+            if len(columns) == 0:
+                raise UploadError("The uploaded file does not contain any characteristics.")
+
+        try:
+            values.extend(record[key] for key in columns)
+        except KeyError as e:
+            raise UploadError(f"Missing characteristic {e} on line {line_no}.")
+
+        if unit_column in record:
+            units.append(str(record[unit_column]))
+
+    if columns is None:
+        raise UploadError("The uploaded file is empty.")
+
+    try:
+        matrix = np.array(values, dtype=np.float64).reshape(-1, len(columns))
+    except (TypeError, ValueError) as e:
+        raise UploadError(f"Invalid characteristics value: {e}")
+
+    if len(units) == 0:
+        pool = np.arange(matrix.shape[0]).astype(str)
+    elif len(units) == matrix.shape[0]:
+        pool = np.array(units)
+    else:
+        raise UploadError(f"The key `{unit_column}` is missing on some lines.")
+
+    return pool, np.ascontiguousarray(matrix.T)
+
+
+def read_parquet(file, unit_column="unit"):
+    """Function to read a Parquet file batch by batch.
+
+    Requires the optional `pyarrow` package.
+
+    Args:
+        file (file-like): A seekable binary file.
+        unit_column (str): The name of the column with unit identifiers.
+            If the column is missing, units are numbered from 0. (default is "unit")
+
+    Returns:
+        tuple: The pool and the characteristics.
+    """
+
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise UploadError(
+            "Parquet uploads require the `pyarrow` package.",
+            type="UNSUPPORTED FORMAT",
+            ctx={"supported": ["csv", "ndjson"]}
+        )
+
+    parquet = pq.ParquetFile(file)
+    names = parquet.schema_arrow.names
+    columns = [name for name in names if name != unit_column]
+
+    if len(columns) == 0:
+        raise UploadError("The uploaded file does not contain any characteristics.")
+
+    n = parquet.metadata.num_rows
+    characteristics = np.empty((len(columns), n), dtype=np.float64)
+    units = [] if unit_column in names else None
+
+    offset = 0
+    for batch in parquet.iter_batches():
+        size = batch.num_rows
+        for idx, name in enumerate(columns):
+            try:
+                characteristics[idx, offset:offset + size] = batch.column(name).to_numpy(zero_copy_only=False)
+            except (TypeError, ValueError) as e:
+                raise UploadError(f"Invalid characteristics value in column `{name}`: {e}")
+        if units is not None:
+            units.append(batch.column(unit_column).to_numpy(zero_copy_only=False).astype(str))
+        offset += size
+
+    pool = np.concatenate(units) if units else np.arange(n).astype(str)
+
+    return pool, characteristics
+
+
+READERS = {
+    "csv": read_csv,
+    "ndjson": read_ndjson,
+    "parquet": read_parquet,
+}
+
+
+def read_upload(file, format, unit_column="unit", max_pool_size=MAX_UPLOAD_POOL_SIZE):
+    """Function to read the uploaded file into the pool and the characteristics.
+
+    Args:
+        file (file-like): A seekable binary file.
+        format (str): One of `csv`, `ndjson` or `parquet`.
+        unit_column (str): The name of the column with unit identifiers. (default is "unit")
+        max_pool_size (int): The maximal allowed number of units.
+
+    Returns:
+        tuple: The pool and the characteristics.
+    """
+
+    pool, characteristics = READERS[format](file, unit_column=unit_column)
+
+    if len(pool) > max_pool_size:
+        raise UploadError(
+            f"The pool size ({len(pool)}) is too large.",
+            type="OUT OF FREE TIER",
+            ctx={"maxSize": {"pool": max_pool_size}}
+        )
+
+    # Missing values (empty cells, null) are read as NaN
+    if not np.isfinite(characteristics).all():
+        raise UploadError("The characteristics contain missing or non-finite values.")
+
+    # The model identifies units by their identifier
+    if len(np.unique(pool)) != len(pool):
+        raise UploadError("The unit identifiers are not unique.")
+
+    return pool, characteristics
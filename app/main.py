@@ -3,13 +3,20 @@
 import os
 import random
 import time
-import numpy as np
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException
-from fastapi import FastAPI, Request, Query, Body, Response
+from typing import List, Optional
+from fastapi import FastAPI, Request, Query, Body, Response, File, Form, UploadFile
+from starlette.responses import PlainTextResponse
 
 
 from surquest.utils.split_balancer import SplitBalancer
+from surquest.utils.split_balancer.errors import (
+    SplitBalancerError,
+    DuplicateUnitsError,
+    OverlappingUnitsError,
+)
+from surquest.utils.split_balancer.metrics import Metrics, add_hook, emit
 # import surquest modules and objects
 from surquest.fastapi.utils.route import Route  # custom routes for documentation and FavIcon
 from surquest.fastapi.utils.GCP.tracer import Tracer
@@ -21,7 +28,8 @@ from surquest.fastapi.utils.GCP.catcher import (
     catch_http_exceptions,
 )
 
-from .schemas import Split
+from .schemas import Split, MAX_POOL_SIZE, MAX_UPLOAD_BYTES, MAX_UPLOAD_POOL_SIZE
+from .serialization import set_response, to_columnar
 
 PATH_PREFIX = os.getenv('PATH_PREFIX','')
 
@@ -66,6 +74,60 @@ Partition the units into two groups (Group A and Group B) of the specified size,
 # add middleware
 app.add_middleware(LoggingMiddleware)
 
+# Allowance for the multipart envelope and the form fields sent along with the uploaded file
+MAX_UPLOAD_FORM_OVERHEAD = 64 * 1024
+
+
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    """Reject uploads announcing a body larger than the limit before the body is received.
+
+    Requests without `Content-Length` (chunked transfer) are checked by `check_size`
+    once the upload has been received.
+    """
+
+    if request.url.path == F"{PATH_PREFIX}/balancer/split/upload":
+
+        content_length = request.headers.get("content-length")
+
+        if content_length is not None and content_length.isdigit() \
+           and int(content_length) > MAX_UPLOAD_BYTES + MAX_UPLOAD_FORM_OVERHEAD:
+
+            return Response.set(
+                status_code=413,
+                errors=[
+                    Message(
+                        msg=f"The uploaded file is too large ({content_length} bytes).",
+                        type="UPLOAD TOO LARGE",
+                        loc=["body", "file"],
+                        ctx={"maxSize": {"bytes": MAX_UPLOAD_BYTES}}
+                    )
+                ],
+            )
+
+    return await call_next(request)
+
+# Endpoints solving a split, counted from the arrival of the request
+SPLIT_PATHS = (
+    F"{PATH_PREFIX}/balancer/split",
+    F"{PATH_PREFIX}/balancer/split/upload",
+    F"{PATH_PREFIX}/benchmark/balancer/split",
+)
+
+
+@app.middleware("http")
+async def count_requests(request: Request, call_next):
+    """Count split requests from their arrival, including the time spent waiting for a worker thread."""
+
+    if request.url.path not in SPLIT_PATHS:
+        return await call_next(request)
+
+    emit("request_start")
+    try:
+        return await call_next(request)
+    finally:
+        emit("request_end")
+
 # exception handlers
 app.add_exception_handler(HTTPException, catch_http_exceptions)
 app.add_exception_handler(RequestValidationError, catch_validation_exceptions)
@@ -74,6 +136,46 @@ app.add_exception_handler(RequestValidationError, catch_validation_exceptions)
 app.add_api_route(path=F"{PATH_PREFIX}/", endpoint=Route.get_documentation, include_in_schema=False)
 app.add_api_route(path=PATH_PREFIX, endpoint=Route.get_favicon, include_in_schema=False)
 
+# metrics collected from the hooks of all SplitBalancer instances
+metrics = Metrics()
+add_hook(metrics)
+
+
+def get_error_loc(error):
+    """Function to get the form field of the upload endpoint causing a SplitBalancerError.
+
+    Args:
+        error (SplitBalancerError): The error raised by the SplitBalancer.
+
+    Returns:
+        list: The location of the error.
+    """
+
+    if isinstance(error, OverlappingUnitsError):
+        return ["body", "inControlGroup"]
+
+    if isinstance(error, DuplicateUnitsError):
+        return ["body", F"out{error.group_type.capitalize()}Group"]
+
+    # The group sizes do not fit the pool or the pre-assignments cannot be satisfied
+    return ["body"]
+
+
+@app.get(
+        F"{PATH_PREFIX}/metrics",
+        tags=["Monitoring"],
+        response_class=PlainTextResponse
+    )
+def get_metrics():
+    """
+    Metrics of the Split Balancer in the Prometheus text exposition format
+    """
+
+    return PlainTextResponse(
+        metrics.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
 
 @app.post(
         F"{PATH_PREFIX}/balancer/split", 
@@ -81,13 +183,18 @@ app.add_api_route(path=PATH_PREFIX, endpoint=Route.get_favicon, include_in_schem
     )
 def split(
     split: Split = Body(...),
+    layout: str = Query(
+        "records",
+        description="The layout of the assignments: `records` (units listed per group) or `columnar` (group index per unit).",
+        pattern="^(records|columnar)$"
+    ),
 ):
     """
     Split Balancer API
     """
 
-    # Raise out of free usage if the pool size is higher than 500
-    max_size = 500
+    # Raise out of free usage if the pool size is higher than the configured limit
+    max_size = MAX_POOL_SIZE
     if len(split.pool) > max_size:
        
        return Response.set(
@@ -117,7 +224,140 @@ def split(
 
     results = model.solve()
 
-    return Response.set(
+    if layout == "columnar":
+        results["assignments"] = to_columnar(split.pool, results["assignments"])
+
+    return set_response(
+        data=results
+    )
+
+
+@app.post(
+        F"{PATH_PREFIX}/balancer/split/upload",
+        tags=["Split Balancer"]
+    )
+def split_upload(
+    file: UploadFile = File(
+        ...,
+        description="CSV, NDJSON or Parquet file with one unit per row and one characteristic per column."
+    ),
+    target_group_size: int = Form(..., alias="targetGroupSize", gt=0),
+    control_group_size: int = Form(..., alias="controlGroupSize", gt=0),
+    in_target_group: List[str] = Form(None, alias="inTargetGroup"),
+    in_control_group: List[str] = Form(None, alias="inControlGroup"),
+    out_target_group: List[str] = Form(None, alias="outTargetGroup"),
+    out_control_group: List[str] = Form(None, alias="outControlGroup"),
+    format: Optional[str] = Query(
+        None,
+        description="The format of the file (`csv`, `ndjson` or `parquet`). Detected from the content type or the file name if omitted."
+    ),
+    unit_column: str = Query(
+        "unit",
+        alias="unitColumn",
+        description="The column with unit identifiers. Units are numbered from 0 if the column is missing."
+    ),
+    layout: str = Query(
+        "columnar",
+        description="The layout of the assignments: `records` (units listed per group) or `columnar` (group index per unit).",
+        pattern="^(records|columnar)$"
+    ),
+):
+    """
+    Split Balancer API for large pools uploaded as a columnar file
+
+    Unit identifiers are read as strings.
+    """
+
+    # The readers (NumPy, optional pyarrow) are loaded on the first upload
+    from .ingest import (
+        UploadError,
+        check_size,
+        detect_format,
+        read_upload,
+    )
+
+    try:
+        check_size(file.file, max_bytes=MAX_UPLOAD_BYTES)
+        pool, characteristics = read_upload(
+            file.file,
+            format=detect_format(file.filename, file.content_type, format),
+            unit_column=unit_column,
+            max_pool_size=MAX_UPLOAD_POOL_SIZE
+        )
+    except UploadError as e:
+
+        return Response.set(
+            status_code=422,
+            errors=[
+                Message(
+                    msg=e.msg,
+                    type=e.type,
+                    loc=["body", "file"],
+                    ctx=e.ctx
+                )
+            ],
+        )
+
+    # Check that the pre-assigned units are in the uploaded pool
+    units = set(pool.tolist())
+    pre_assignments = {
+        "inTargetGroup": in_target_group,
+        "inControlGroup": in_control_group,
+        "outTargetGroup": out_target_group,
+        "outControlGroup": out_control_group,
+    }
+
+    errors = []
+    for alias, group in pre_assignments.items():
+
+        unknown = [unit for unit in group or [] if unit not in units]
+
+        if len(unknown) > 0:
+            errors.append(
+                Message(
+                    msg=f"Units not found in the uploaded pool: {unknown[0:5]}" + (f" and {len(unknown) - 5} more" if len(unknown) > 5 else ""),
+                    type="UNKNOWN UNITS",
+                    loc=["body", alias],
+                    ctx={"units": unknown[0:5]}
+                )
+            )
+
+    if len(errors) > 0:
+
+        return Response.set(status_code=422, errors=errors)
+
+    try:
+        model = SplitBalancer(
+            pool=pool,
+            characteristics=characteristics,
+            target_group_size=target_group_size,
+            control_group_size=control_group_size,
+            in_target_group=in_target_group,
+            in_control_group=in_control_group,
+            out_target_group=out_target_group,
+            out_control_group=out_control_group,
+        )
+
+        results = model.solve()
+
+    except SplitBalancerError as e:
+
+        return Response.set(
+            status_code=422,
+            errors=[
+                Message(
+                    msg=e.message,
+                    type="INVALID SPLIT",
+                    loc=get_error_loc(e),
+                    ctx={"error": type(e).__name__}
+                )
+            ],
+        )
+
+    if layout == "columnar":
+        results["assignments"] = to_columnar(pool, results["assignments"])
+
+    return set_response(
         data=results
     )
 
@@ -166,6 +406,6 @@ def banchmark_split(
 
     results = model.solve()
 
-    return Response.set(
+    return set_response(
         data=results
     )
\ No newline at end of file
@@ -1,7 +1,16 @@
+import os
 from pydantic import BaseModel, Field
 from typing import List, Optional
 
 
+# Maximal pool size accepted in the JSON body, larger pools should be uploaded as a file
+MAX_POOL_SIZE = int(os.getenv("MAX_POOL_SIZE", 500))
+
+# Limits of the uploaded files
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 64 * 1024 * 1024))
+MAX_UPLOAD_POOL_SIZE = int(os.getenv("MAX_UPLOAD_POOL_SIZE", 100_000))
+
+
 class Split(BaseModel):
     """Inputs for running the SplitBalancer"""
 
@@ -10,7 +19,7 @@ class Split(BaseModel):
         example=[0, 1, 2, 3, 4, 5, 6, 7, 8, 9],
         description="A list of the pool of units.",
         min_items=2,
-        max_items=100,
+        max_items=MAX_POOL_SIZE,
     )
 
     characteristics: List[List] = Field(
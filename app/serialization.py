@@ -0,0 +1,83 @@
+"""File serialization.py with fast JSON responses aware of NumPy types
+
+NumPy is imported on first use only, orjson serializes NumPy types without it.
+"""
+import orjson
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import JSONResponse
+from surquest.fastapi.schemas.responses import InfoSuccess
+
+
+class NumpyJSONResponse(JSONResponse):
+    """JSON response rendered by orjson with native support of NumPy arrays and scalars."""
+
+    option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def render(self, content) -> bytes:
+
+        return orjson.dumps(content, option=self.option, default=_default)
+
+
+def _default(obj):
+    """Fallback for types orjson does not serialize natively (e.g. non-contiguous arrays)."""
+
+    import numpy as np
+
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+
+    if isinstance(obj, np.generic):
+        return obj.item()
+
+    if isinstance(obj, range):
+        return list(obj)
+
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def set_response(data, metadata=None, status_code=200):
+    """Function to build the success response without per-item pydantic validation.
+
+    The envelope is the same as the one of `Response.set(data=...)`.
+
+    Args:
+        data (dict): The data of the response.
+        metadata (dict): The metadata of the response. (default is None)
+        status_code (int): The HTTP status code. (default is 200)
+
+    Returns:
+        NumpyJSONResponse: The response.
+    """
+
+    return NumpyJSONResponse(
+        status_code=status_code,
+        content={
+            "info": jsonable_encoder(InfoSuccess(metadata=metadata)),
+            "data": data
+        }
+    )
+
+
+def to_columnar(pool, assignments, groups=("target", "control", "unassigned")):
+    """Function to convert the assignments into a compact columnar layout.
+
+    Args:
+        pool (list): The pool of units in the order of the input.
+        assignments (dict): The units assigned into each group.
+        groups (tuple): The names of the groups. (default is ("target", "control", "unassigned"))
+
+    Returns:
+        dict: The units, the names of the groups and the index of the group for each unit.
+    """
+
+    import numpy as np
+
+    code = {}
+    for idx, group in enumerate(groups):
+        code.update(dict.fromkeys(assignments.get(group, []), idx))
+
+    return {
+        "units": pool if isinstance(pool, np.ndarray) else list(pool),
+        "groups": list(groups),
+        "group": np.fromiter((code[i] for i in pool), dtype=np.int8, count=len(pool)),
+    }
@@ -0,0 +1,195 @@
+"""Chunked access to the characteristics of the units.
+
+The characteristics are a 2D array of shape (number of characteristics, number of units)
+given as a list of lists, a NumPy array (including `numpy.memmap`), any array-like with
+a `shape` supporting `matrix[:, start:stop]` slicing (e.g. HDF5 or Zarr datasets), or a path
+to a `.npy` file. The functions below read such a matrix chunk by chunk along the units so
+that only one chunk is materialised in memory at a time.
+"""
+import operator
+import os
+import numpy as np
+
+
+# Number of units (columns) read at once
+CHUNK_SIZE = 65536
+
+
+class NpyReader:
+    """Chunked reader of a 2D `.npy` file.
+
+    Chunks are read with plain file reads instead of memory mapping, so the pages
+    of the file already processed do not stay in the resident memory of the process.
+    """
+
+    def __init__(self, path):
+        self.path = os.fspath(path)
+
+        with open(self.path, "rb") as file:
+            version = np.lib.format.read_magic(file)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(file)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(file)
+            self.offset = file.tell()
+
+        if len(shape) != 2:
+            raise ValueError(f"Expected a 2D array in {self.path}, got shape {shape}")
+
+        if dtype.hasobject:
+            raise ValueError(f"Arrays of Python objects are not supported: {self.path}")
+
+        self.shape = shape
+        self.ndim = 2
+        self.dtype = dtype
+        self.fortran_order = fortran_order
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __repr__(self):
+        return f"NpyReader({self.path!r}, shape={self.shape}, dtype={self.dtype})"
+
+    def __getitem__(self, key):
+
+        if not isinstance(key, tuple):
+            key = (key, slice(None))
+
+        rows, cols = key
+        if not isinstance(rows, slice):
+            # A single row (int or NumPy integer, negative counted from the end)
+            row = operator.index(rows)
+            if not -self.shape[0] <= row < self.shape[0]:
+                raise IndexError(f"Row {row} is out of bounds for {self.shape[0]} rows")
+
+            row %= self.shape[0]
+            return self._read(slice(row, row + 1), cols)[0]
+
+        return self._read(rows, cols)
+
+    def _read(self, rows, cols):
+
+        n_rows, n_cols = self.shape
+        row_start, row_stop, _ = rows.indices(n_rows)
+        col_start, col_stop, _ = cols.indices(n_cols)
+        row_stop, col_stop = max(row_start, row_stop), max(col_start, col_stop)
+
+        itemsize = self.dtype.itemsize
+        block = np.empty((row_stop - row_start, col_stop - col_start), dtype=self.dtype)
+
+        with open(self.path, "rb") as file:
+
+            if self.fortran_order:
+                # Columns are contiguous, read the whole columns and keep the requested rows
+                file.seek(self.offset + col_start*n_rows*itemsize)
+                data = np.fromfile(file, dtype=self.dtype, count=(col_stop - col_start)*n_rows)
+                block[:] = data.reshape((col_stop - col_start, n_rows)).T[row_start:row_stop]
+
+            else:
+                # Rows are contiguous, read the requested segment of each row
+                for idx, row in enumerate(range(row_start, row_stop)):
+                    file.seek(self.offset + (row*n_cols + col_start)*itemsize)
+                    block[idx] = np.fromfile(file, dtype=self.dtype, count=col_stop - col_start)
+
+        return block
+
+
+def as_chunked(characteristics):
+    """Function to get the characteristics as a 2D array-like that can be read in chunks.
+
+    Args:
+        characteristics: A list of lists, an array-like with a `shape` or a path to a `.npy` file.
+
+    Returns:
+        array-like: The characteristics supporting `shape` and `[:, start:stop]` slicing.
+    """
+
+    if isinstance(characteristics, (str, os.PathLike)):
+        return NpyReader(characteristics)
+
+    if getattr(characteristics, "ndim", None) == 2 and hasattr(characteristics, "__getitem__"):
+        return characteristics
+
+    return np.asarray(characteristics, dtype=np.float64)
+
+
+def check_chunk_size(chunk_size):
+    """Function to check that the number of units in a chunk is a positive integer.
+
+    Args:
+        chunk_size (int): The number of units in a chunk.
+    """
+
+    if isinstance(chunk_size, bool) or not hasattr(chunk_size, "__index__") or chunk_size < 1:
+        raise ValueError(f"The chunk size must be a positive integer, got {chunk_size!r}")
+
+
+def iter_chunks(matrix, chunk_size=CHUNK_SIZE):
+    """Function to iterate over the characteristics in chunks of units.
+
+    Args:
+        matrix (array-like): The characteristics, see `as_chunked`.
+        chunk_size (int): The number of units in a chunk. (default is CHUNK_SIZE)
+
+    Yields:
+        tuple: The first and the last + 1 unit of the chunk and the chunk as a float64 array.
+    """
+
+    check_chunk_size(chunk_size)
+
+    n = matrix.shape[1]
+
+    for start in range(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+        yield start, stop, np.asarray(matrix[:, start:stop], dtype=np.float64)
+
+
+def simplify(matrix, chunk_size=CHUNK_SIZE):
+    """Function to reduce the characteristics to a single score per unit in a single pass.
+
+    The characteristics are standardized between 0 and 1 using the minimum and the maximum
+    of the whole matrix and averaged per unit. As the standardization is linear, the raw
+    average of each unit is accumulated first and standardized once the minimum and
+    the maximum are known.
+
+    Args:
+        matrix (array-like): The characteristics, see `as_chunked`.
+        chunk_size (int): The number of units in a chunk. (default is CHUNK_SIZE)
+
+    Returns:
+        numpy.ndarray: The score of each unit.
+    """
+
+    score = np.empty(matrix.shape[1], dtype=np.float64)
+    minimum, maximum = np.inf, -np.inf
+
+    for start, stop, chunk in iter_chunks(matrix, chunk_size):
+        minimum = min(minimum, chunk.min())
+        maximum = max(maximum, chunk.max())
+        np.mean(chunk, axis=0, out=score[start:stop])
+
+    score -= minimum
+    score /= maximum - minimum
+
+    return score
+
+
+def weighted_sums(matrix, weights, chunk_size=CHUNK_SIZE):
+    """Function to compute the sums of the characteristics weighted by the vectors of units.
+
+    Args:
+        matrix (array-like): The characteristics, see `as_chunked`.
+        weights (dict): Vectors with a weight of each unit (e.g. 0/1 membership in a group).
+        chunk_size (int): The number of units in a chunk. (default is CHUNK_SIZE)
+
+    Returns:
+        dict: The sum of each characteristic for each vector of weights.
+    """
+
+    sums = {key: np.zeros(matrix.shape[0], dtype=np.float64) for key in weights}
+
+    for start, stop, chunk in iter_chunks(matrix, chunk_size):
+        for key, vector in weights.items():
+            sums[key] += chunk @ vector[start:stop]
+
+    return sums
@@ -59,6 +59,15 @@ class InvalidGroupSizeError(SplitBalancerError):
         super().__init__(message)   
 
 
+class InvalidChunkSizeError(SplitBalancerError):
+    """Exception raised when the number of units processed at once is not a positive integer."""
+
+    def __init__(self, chunk_size):
+        self.chunk_size = chunk_size
+        message = f"Invalid chunk size: Chunk size ({self.chunk_size!r}) is not a positive integer."
+        super().__init__(message)
+
+
 class NoOptimalSolutionError(SplitBalancerError):
     """Exception raised when there is no optimal solution to the split balancing problem."""
 
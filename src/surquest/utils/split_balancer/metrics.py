@@ -0,0 +1,251 @@
+"""Hooks around the SplitBalancer and Prometheus-style metrics collected from them.
+
+Usage:
+
+    from surquest.utils.split_balancer.metrics import Metrics, add_hook
+
+    metrics = Metrics()
+    add_hook(metrics)
+    ...
+    print(metrics.render())  # Prometheus text exposition format
+"""
+import logging
+import math
+import threading
+
+
+_hooks = []
+
+
+def add_hook(hook):
+    """Function to register a hook called on the events of every SplitBalancer.
+
+    Args:
+        hook (callable): A callable with signature `hook(event, **data)`.
+    """
+
+    if hook not in _hooks:
+        _hooks.append(hook)
+
+
+def remove_hook(hook):
+    """Function to unregister a hook registered by `add_hook`.
+
+    Args:
+        hook (callable): The registered hook.
+    """
+
+    if hook in _hooks:
+        _hooks.remove(hook)
+
+
+def emit(event, **data):
+    """Function to call all registered hooks with the event.
+
+    Events emitted by `SplitBalancer.solve`:
+
+    * `start` (pool_size): the solve started
+    * `build` (pool_size, duration): the model was built
+    * `solve` (pool_size, duration, reason, limit, objective): the solver finished
+    * `error` (pool_size, error): the solve failed with an exception
+    * `end` (pool_size): the solve finished (successfully or not)
+
+    The REST API emits `request_start` and `request_end` (no data) when a split request
+    is received and answered, so requests waiting for a worker thread are counted too.
+
+    Exceptions raised by a hook are logged and do not interrupt the solve.
+
+    Args:
+        event (str): The name of the event.
+        **data: The data of the event.
+    """
+
+    for hook in list(_hooks):
+        try:
+            hook(event, **data)
+        except Exception:
+            logging.exception("Hook %r failed on the event %r.", hook, event)
+
+
+class Histogram:
+    """Histogram with cumulative buckets labelled by a tuple of label values."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets) + (math.inf,)
+        self.series = {}
+
+    def observe(self, labels, value):
+        counts, total = self.series.get(labels, ([0] * len(self.buckets), 0.0))
+        for idx, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[idx] += 1
+        self.series[labels] = (counts, total + value)
+
+
+class Metrics:
+    """Hook collecting the metrics of the SplitBalancer."""
+
+    # Upper bounds of the pool size buckets used as a label of the metrics
+    POOL_SIZE_BUCKETS = (10, 100, 500, 1000, 5000, 10000, 100000)
+
+    # Upper bounds of the duration histograms in seconds
+    DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 120, 180, 300)
+
+    # Termination reasons of MathOpt meaning the search was stopped by a limit before proving
+    # optimality (or infeasibility). `SplitBalancer.solve` sets a time limit only, so these are
+    # timeouts; CP-SAT reports the limit itself as UNDETERMINED.
+    TIMEOUT_REASONS = ("FEASIBLE", "NO_SOLUTION_FOUND")
+
+    def __init__(self, prefix="split_balancer"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self.build_seconds = Histogram(self.DURATION_BUCKETS)
+        self.solve_seconds = Histogram(self.DURATION_BUCKETS)
+        self.terminations = {}
+        self.errors = {}
+        self.objective = {}
+        self.in_progress = 0
+        self.requests_in_progress = 0
+
+    @classmethod
+    def pool_size_bucket(cls, pool_size):
+        """Method to get the label of the pool size bucket.
+
+        Args:
+            pool_size (int): The size of the pool.
+
+        Returns:
+            str: The upper bound of the bucket (`+Inf` for the largest pools).
+        """
+
+        for bound in cls.POOL_SIZE_BUCKETS:
+            if pool_size <= bound:
+                return str(bound)
+
+        return "+Inf"
+
+    def __call__(self, event, **data):
+
+        with self._lock:
+
+            if event == "start":
+                self.in_progress += 1
+
+            elif event == "end":
+                self.in_progress -= 1
+
+            elif event == "request_start":
+                self.requests_in_progress += 1
+
+            elif event == "request_end":
+                self.requests_in_progress -= 1
+
+            elif event == "build":
+                labels = (self.pool_size_bucket(data["pool_size"]),)
+                self.build_seconds.observe(labels, data["duration"])
+
+            elif event == "solve":
+                bucket = self.pool_size_bucket(data["pool_size"])
+                self.solve_seconds.observe((bucket,), data["duration"])
+
+                timeout = "true" if data["reason"] in self.TIMEOUT_REASONS else "false"
+                labels = (data["reason"], data.get("limit") or "", timeout)
+                self.terminations[labels] = self.terminations.get(labels, 0) + 1
+
+                if data.get("objective") is not None:
+                    self.objective[(bucket,)] = data["objective"]
+
+            elif event == "error":
+                labels = (type(data["error"]).__name__,)
+                self.errors[labels] = self.errors.get(labels, 0) + 1
+
+    def render(self):
+        """Method to render the metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: The metrics.
+        """
+
+        lines = []
+
+        with self._lock:
+
+            self._render_histogram(
+                lines, "build_seconds", "Time to build the optimization model.",
+                self.build_seconds, ("pool_size",)
+            )
+            self._render_histogram(
+                lines, "solve_seconds", "Time spent by the solver.",
+                self.solve_seconds, ("pool_size",)
+            )
+            self._render_series(
+                lines, "terminations_total", "counter", "Solver terminations by reason, limit and timeout.",
+                self.terminations, ("reason", "limit", "timeout")
+            )
+            self._render_series(
+                lines, "errors_total", "counter", "Failed solves by exception type (e.g. NoOptimalSolutionError).",
+                self.errors, ("error",)
+            )
+            self._render_series(
+                lines, "objective_value", "gauge", "Objective value of the last solution.",
+                self.objective, ("pool_size",)
+            )
+            self._render_series(
+                lines, "in_progress", "gauge", "Number of solves running.",
+                {(): self.in_progress}, ()
+            )
+            self._render_series(
+                lines, "requests_in_progress", "gauge", "Number of split requests received and not answered yet.",
+                {(): self.requests_in_progress}, ()
+            )
+            self._render_series(
+                lines, "queued", "gauge", "Number of split requests received and not solving yet (e.g. waiting for a worker thread).",
+                {(): max(self.requests_in_progress - self.in_progress, 0)}, ()
+            )
+
+        return "\n".join(lines) + "\n"
+
+    def _render_series(self, lines, name, type, help, series, label_names):
+
+        name = f"{self.prefix}_{name}"
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} {type}")
+
+        for labels, value in sorted(series.items()):
+            lines.append(f"{name}{_labels(label_names, labels)} {_number(value)}")
+
+    def _render_histogram(self, lines, name, help, histogram, label_names):
+
+        name = f"{self.prefix}_{name}"
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} histogram")
+
+        for labels, (counts, total) in sorted(histogram.series.items()):
+            for bound, count in zip(histogram.buckets, counts):
+                le = _labels(label_names + ("le",), labels + (_number(bound),))
+                lines.append(f"{name}_bucket{le} {count}")
+            lines.append(f"{name}_sum{_labels(label_names, labels)} {_number(total)}")
+            lines.append(f"{name}_count{_labels(label_names, labels)} {counts[-1]}")
+
+
+def _labels(names, values):
+
+    if len(names) == 0:
+        return ""
+
+    pairs = ",".join(
+        '{}="{}"'.format(
+            name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        )
+        for name, value in zip(names, values)
+    )
+
+    return "{" + pairs + "}"
+
+
+def _number(value):
+
+    if value == math.inf:
+        return "+Inf"
+
+    return repr(float(value)) if isinstance(value, float) else str(value)
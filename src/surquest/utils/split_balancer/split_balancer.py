@@ -2,12 +2,15 @@
 
 """
 from typing import Optional
-from ortools.math_opt.python import mathopt
-from ortools.math_opt.python.ipc import remote_http_solve
 from datetime import datetime, timedelta
 from surquest.utils.split_balancer.errors import *
-import numpy as np
+from surquest.utils.split_balancer.metrics import emit
 import logging
+import time
+
+# OR-Tools and NumPy are imported on first use (see `_get_model`, `solve` and
+# `simplify_characteristics`) to keep the import of the package and the input
+# validation cheap, e.g. on cold starts of serverless deployments.
 
 
 class SplitBalancer:
@@ -23,19 +26,24 @@ class SplitBalancer:
         in_target_group: Optional[list] = None,
         in_control_group: Optional[list] = None,
         out_target_group: Optional[list] = None,
-        out_control_group: Optional[list] = None
+        out_control_group: Optional[list] = None,
+        chunk_size: Optional[int] = None
     ):
         """Initializes the SplitBalancer class.
 
         Args:
             pool (list): A list of the pool of units.
             characteristics (list of list): An array of the characteristics of the units.
+                Large matrices can be given as a `numpy.memmap`, another array-like with
+                `shape` and `[:, start:stop]` slicing or a path to a `.npy` file.
             target_group_size (int): The size of the target group.
             control_group_size (int): The size of the control group.
             in_target_group (list): A list of the units that must be in the target group.
             in_control_group (list): A list of the units that must be in the control group.
             out_target_group (list): A list of the units that must be out ofthe target group.
             out_control_group (list): A list of the units that must be out the control group.
+            chunk_size (int): The number of units of the characteristics processed at once.
+                (default is None for chunks.CHUNK_SIZE)
         """
 
         # Validate the input
@@ -83,6 +91,13 @@ class SplitBalancer:
 
             raise InvalidGroupSizeError(control_group_size, len(pool))
 
+        # Check if the chunk size is a positive integer
+        if chunk_size is not None and (
+            isinstance(chunk_size, bool) or not hasattr(chunk_size, "__index__") or chunk_size < 1
+        ):
+
+            raise InvalidChunkSizeError(chunk_size)
+
         self.pool = pool
         self.characteristics = characteristics
         self.target_group_size = target_group_size
@@ -91,27 +106,35 @@ class SplitBalancer:
         self.in_control_group = in_control_group
         self.out_target_group = out_target_group
         self.out_control_group = out_control_group
+        self.chunk_size = chunk_size
 
         # Log inputs
-        logging.info(f"Pool: {self.pool}")
-        logging.info(f"Characteristics: {self.characteristics}")
-        logging.info(f"Target group size: {self.target_group_size}")
-        logging.info(f"Control group size: {self.control_group_size}")
-        logging.info(f"In target group: {self.in_target_group}")
-        logging.info(f"In control group: {self.in_control_group}")
-        logging.info(f"Out target group: {self.out_target_group}")
-        logging.info(f"Out control group: {self.out_control_group}")
+        logging.info("Pool: %s", self.pool)
+        logging.info("Characteristics: %s", self.characteristics)
+        logging.info("Target group size: %s", self.target_group_size)
+        logging.info("Control group size: %s", self.control_group_size)
+        logging.info("In target group: %s", self.in_target_group)
+        logging.info("In control group: %s", self.in_control_group)
+        logging.info("Out target group: %s", self.out_target_group)
+        logging.info("Out control group: %s", self.out_control_group)
 
         self.groups = ["target", "control", "unassigned"]
 
 
-    def _get_model(self, integer_only=False):
+    def _get_model(self, integer_only=False, strengthen=False):
         """Method to create the optimization model.
 
+        Args:
+            integer_only (bool): Whether to use integer coefficients of the distance. (default is False)
+            strengthen (bool): Whether to add symmetry-breaking, bounds and redundant constraints,
+                see `_strengthen_model`. (default is False)
+
         Returns:
             pywraplp.Solver: The optimization model.
         """
 
+        from ortools.math_opt.python import mathopt
+
         pool = self.pool
         groups = self.groups
         target_group_size = self.target_group_size
@@ -150,11 +173,12 @@ class SplitBalancer:
             sum(x[(i, groups[1])] for i in pool) == control_group_size
         )
 
-        simple_char = self.simplify_characteristics(self.characteristics)
+        simple_char = self.simplify_characteristics(self.characteristics, chunk_size=self.chunk_size)
 
         if integer_only is True:
           const = 10000
           coef = int(target_group_size/control_group_size)*const
+          scale = (const, coef)
 
           avg_target_char = sum(
               x[(i, "target")]*simple_char[idx] for idx, i in enumerate(pool)
@@ -165,7 +189,8 @@ class SplitBalancer:
           )*coef
 
         else:
-        
+          scale = (1/target_group_size, 1/control_group_size)
+
           avg_target_char = sum(
               x[(i, "target")]*simple_char[idx] for idx, i in enumerate(pool)
           )/target_group_size
@@ -203,28 +228,173 @@ class SplitBalancer:
             for i in self.out_control_group:
                 model.add_linear_constraint(x[(i, self.groups[1])] == 0)
 
+        if strengthen is True:
+            self._strengthen_model(model, x, b, simple_char, scale, integer_only=integer_only)
+
         model.minimize(b)
 
         return model, x, b
 
-    def solve(self, integer_only=False, limit=180, remote=False, api_key=None):
+    def _strengthen_model(self, model, x, b, simple_char, scale, integer_only=False):
+        """Method to add constraints that do not change the optimum but help the solver to prove it.
+
+        * Units with the same simplified characteristic and the same pre-assignment constraints
+          are interchangeable, so they are ordered (target before control before unassigned)
+          in the order of the pool.
+        * The sums of the simplified characteristic of the groups are bounded by their ranges
+          reachable with the given group sizes and pre-assignment constraints, and so is `b`
+          with integer coefficients.
+        * The number of unassigned units is fixed by a redundant aggregate constraint.
+
+        Args:
+            model (mathopt.Model): The optimization model.
+            x (dict): The assignment variables.
+            b (mathopt.Variable): The distance variable.
+            simple_char (numpy.ndarray): The simplified characteristics of the units.
+            scale (tuple): The coefficients of the target and control sums in the distance constraints.
+            integer_only (bool): Whether `b` is an integer variable. (default is False)
+        """
+
+        import math
+        import numpy as np
+
+        pool = list(self.pool)
+        target, control, unassigned = self.groups
+        n = len(pool)
+        target_size, control_size = self.target_group_size, self.control_group_size
+        scale_target, scale_control = scale
+
+        # Break the symmetry of interchangeable units
+        fixed = [
+            set(units) if units is not None else set()
+            for units in (self.in_target_group, self.in_control_group, self.out_target_group, self.out_control_group)
+        ]
+
+        def key(idx):
+            return (simple_char[idx],) + tuple(pool[idx] in units for units in fixed)
+
+        order = np.argsort(simple_char, kind="stable")
+
+        for prev, curr in zip(order[:-1], order[1:]):
+            if key(prev) == key(curr):
+                i, k = pool[prev], pool[curr]
+                model.add_linear_constraint(x[(i, target)] >= x[(k, target)])
+                model.add_linear_constraint(
+                    x[(i, target)] + x[(i, control)] >= x[(k, target)] + x[(k, control)]
+                )
+
+        # Range of the sums of the simplified characteristic for the given group sizes
+        # with the units that must be in the group and without the units that cannot be in it
+        in_target, in_control, out_target, out_control = fixed
+        index = {unit: idx for idx, unit in enumerate(pool)}
+
+        # Widen the ranges to stay valid under floating point errors of the sums
+        tolerance = 1e-6*max(1.0, float(np.sum(simple_char)))
+
+        def sum_range(size, included, excluded):
+            mask = np.zeros(n, dtype=bool)
+            mask[[index[unit] for unit in included]] = True
+            base = float(np.sum(simple_char[mask]))
+
+            mask[[index[unit] for unit in excluded]] = True
+            free = np.sort(simple_char[~mask])
+
+            # The sizes cannot be met, the model is infeasible and any range is valid
+            count = min(max(size - len(included), 0), len(free))
+            cumsum = np.concatenate(([0.0], np.cumsum(free)))
+
+            return (
+                base + cumsum[count] - tolerance,
+                base + cumsum[len(free)] - cumsum[len(free) - count] + tolerance
+            )
+
+        lo_target, hi_target = sum_range(target_size, in_target, out_target | in_control)
+        lo_control, hi_control = sum_range(control_size, in_control, out_control | in_target)
+        lo_both, hi_both = sum_range(
+            target_size + control_size, in_target | in_control, out_target & out_control
+        )
+
+        # Bound the distance of the integer model by the gap and the span of the reachable
+        # ranges of the weighted sums. A continuous `b` is left unbounded: CP-SAT scales it to an integer
+        # variable and a fractional bound off the scaling grid shifts or cuts off the optimum. The gap
+        # is implied there by the aggregate constraints below.
+        if integer_only is True:
+            lower = max(
+                0.0,
+                scale_target*lo_target - scale_control*hi_control,
+                scale_control*lo_control - scale_target*hi_target
+            )
+            upper = max(
+                lower,
+                scale_target*hi_target - scale_control*lo_control,
+                scale_control*hi_control - scale_target*lo_target
+            )
+            b.lower_bound = math.floor(lower)
+            b.upper_bound = math.ceil(upper)
+
+        # Redundant aggregate constraints
+        model.add_linear_constraint(
+            sum(x[(i, unassigned)] for i in pool) == n - target_size - control_size
+        )
+
+        sum_target = sum(x[(i, target)]*simple_char[idx] for idx, i in enumerate(pool))
+        sum_control = sum(x[(i, control)]*simple_char[idx] for idx, i in enumerate(pool))
+
+        model.add_linear_constraint(sum_target >= lo_target)
+        model.add_linear_constraint(sum_target <= hi_target)
+        model.add_linear_constraint(sum_control >= lo_control)
+        model.add_linear_constraint(sum_control <= hi_control)
+        model.add_linear_constraint(sum_target + sum_control >= lo_both)
+        model.add_linear_constraint(sum_target + sum_control <= hi_both)
+
+    def solve(self, integer_only=False, limit=180, remote=False, api_key=None, strengthen=False):
         """Method to solve the optimization model.
 
         Args:
             limit (int): The time limit for the optimization model. (default is 60 seconds)
             remote (bool): Whether to solve the optimization model remotely. (default is False)
             api_key (str): The API key for the remote solver. (default is None)
+            strengthen (bool): Whether to strengthen the model to prove optimality faster. (default is False)
         Returns:
             dict: A dictionary with the units in each group.
         """
 
+        pool_size = len(self.pool)
+        emit("start", pool_size=pool_size)
+
+        try:
+            return self._solve(
+                integer_only=integer_only, limit=limit, remote=remote, api_key=api_key, strengthen=strengthen
+            )
+
+        except Exception as e:
+            emit("error", pool_size=pool_size, error=e)
+            raise
+
+        finally:
+            emit("end", pool_size=pool_size)
+
+    def _solve(self, integer_only=False, limit=180, remote=False, api_key=None, strengthen=False):
+        """Method to build and solve the optimization model, see `solve`."""
+
+        import numpy as np
+        from ortools.math_opt.python import mathopt
+        from surquest.utils.split_balancer.chunks import CHUNK_SIZE, as_chunked, weighted_sums
+
         groups = {"target": [], "control": [], "unassigned": []}
 
-        model, x, b = self._get_model(integer_only=integer_only)
+        start = time.perf_counter()
+        model, x, b = self._get_model(integer_only=integer_only, strengthen=strengthen)
+        emit("build", pool_size=len(self.pool), duration=time.perf_counter() - start)
+
         params = mathopt.SolveParameters(time_limit=timedelta(seconds=limit))
 
         # Solve the optimization model
+        start = time.perf_counter()
         if remote is True:
+            # Pulls in `requests`, load it only when the remote solver is used
+            from ortools.math_opt.python.ipc import remote_http_solve
+
             api_key = api_key
             result, logs = remote_http_solve.remote_http_solve(
                 model, 
@@ -240,42 +410,58 @@ class SplitBalancer:
                 params=params
             )
 
+        has_solution = result.has_primal_feasible_solution()
+        emit(
+            "solve",
+            pool_size=len(self.pool),
+            duration=time.perf_counter() - start,
+            reason=result.termination.reason.name,
+            limit=result.termination.limit.name if result.termination.limit is not None else None,
+            objective=result.objective_value() if has_solution else None
+        )
+
         if result.termination.reason == mathopt.TerminationReason.OPTIMAL \
            or result.termination.reason == mathopt.TerminationReason.FEASIBLE:
 
+            # Fetch the solution once instead of re-resolving it for every unit and group
+            values = result.variable_values()
+
             vec = {
-                "target": np.array([result.variable_values()[x[(i, self.groups[0])]] for i in self.pool]),
-                "control": np.array([result.variable_values()[x[(i, self.groups[1])]] for i in self.pool]),
-                "unassigned": np.array([result.variable_values()[x[(i, self.groups[2])]] for i in self.pool])
+                "target": np.array([values[x[(i, self.groups[0])]] for i in self.pool]),
+                "control": np.array([values[x[(i, self.groups[1])]] for i in self.pool]),
+                "unassigned": np.array([values[x[(i, self.groups[2])]] for i in self.pool])
             }
 
             # Get units in target and control groups
             for i in self.pool:
                 for j in self.groups:
-                    if result.variable_values()[x[(i, j)]] == 1:
+                    if values[x[(i, j)]] == 1:
                         groups[j].append(i)
 
-            # Get avg characteristics for each group
+            # Get avg characteristics for each group, reading the characteristics chunk by chunk
             avg = {"characteristics": [], "total": None}
 
-            n_characteristics = len(self.characteristics)
+            matrix = as_chunked(self.characteristics)
+            sums = weighted_sums(
+                matrix,
+                {"target": vec.get("target"), "control": vec.get("control")},
+                chunk_size=self.chunk_size or CHUNK_SIZE
+            )
 
-            for ch in range(n_characteristics):
+            n_characteristics = matrix.shape[0]
 
-                vec_characteristics = np.array(self.characteristics[ch])
+            for ch in range(n_characteristics):
 
                 char_avg = {
-                    "target": np.dot(vec.get("target"), vec_characteristics)
-                    / self.target_group_size,
-                    "control": np.dot(vec.get("control"), vec_characteristics)
-                    / self.control_group_size,
+                    "target": sums["target"][ch] / self.target_group_size,
+                    "control": sums["control"][ch] / self.control_group_size,
                 }
 
                 avg["characteristics"].append(char_avg)
 
             # Get total avg characteristics
             avg["total"] = {
-                "objectiveFunction": result.variable_values()[b],
+                "objectiveFunction": values[b],
                 "target": np.sum(
                     [
                         avg["characteristics"][ch]["target"]
@@ -298,25 +484,23 @@ class SplitBalancer:
         return {"stats": avg, "assignments": groups}
 
     @staticmethod
-    def simplify_characteristics(characteristics, do_rescale=True, scale=1):
+    def simplify_characteristics(characteristics, do_rescale=True, scale=1, chunk_size=None):
         """Method to simplify the characteristics of the units.
         to a single vector with values between 0 and 1.
 
+        The characteristics are standardized and averaged in a single pass over chunks
+        of units, so a memory-mapped or on-disk matrix is never loaded as a whole.
+
         Args:
-            characteristics (list of list): The characteristics of the units.
+            characteristics (list of list): The characteristics of the units
+                (or an array-like / path to a `.npy` file, see `chunks.as_chunked`).
             do_rescale (bool): Whether to rescale (integers in rage 0 and 1000) the characteristics. 
+            chunk_size (int): The number of units processed at once. (default is chunks.CHUNK_SIZE)
 
         Returns:
             list: The simplified characteristics of the units.
         """
 
+        from surquest.utils.split_balancer.chunks import CHUNK_SIZE, as_chunked, simplify
 
-        matrix = np.array(characteristics)
-        
-        # Standardize the characteristics between 0 and 1
-        std_matrix = (matrix - matrix.min()) / (matrix.max() - matrix.min())
-
-        # Calculate the mean for each characteristic (column)
-        average_unit = np.mean(std_matrix, axis=0)
-
-        return average_unit
\ No newline at end of file
+        return simplify(as_chunked(characteristics), chunk_size=chunk_size or CHUNK_SIZE)
\ No newline at end of file
@@ -0,0 +1,195 @@
+import io
+import numpy as np
+import pytest
+
+pytest.importorskip("orjson")
+pytest.importorskip("pydantic")
+
+from app.ingest import (
+    UploadError,
+    check_size,
+    detect_format,
+    read_csv,
+    read_ndjson,
+    read_parquet,
+    read_upload,
+)
+
+
+csv_with_units = b'unit,a,b\nA,4,2\nB,5,3\n"C,D",6,4\n'
+csv_without_units = b"a,b\n4,2\n5,3\n6,4\n"
+ndjson_with_units = b'{"unit": "A", "a": 4, "b": 2}\n{"unit": "B", "a": 5, "b": 3}\n\n{"unit": "C,D", "a": 6, "b": 4}\n'
+ndjson_without_units = b'{"a": 4, "b": 2}\n{"a": 5, "b": 3}\n{"a": 6, "b": 4}\n'
+expected = np.array([[4, 5, 6], [2, 3, 4]], dtype=np.float64)
+
+
+def parquet(with_units=True):
+
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+
+    columns = {"a": [4.0, 5.0, 6.0], "b": [2, 3, 4]}
+    if with_units:
+        columns = {"unit": ["A", "B", "C,D"], **columns}
+
+    file = io.BytesIO()
+    pq.write_table(pa.table(columns), file, row_group_size=2)
+    file.seek(0)
+
+    return file
+
+
+class TestReaders:
+
+    @pytest.mark.parametrize(
+        "reader, content, units",
+        [
+            (read_csv, csv_with_units, ["A", "B", "C,D"]),
+            (read_csv, csv_without_units, ["0", "1", "2"]),
+            (read_csv, b"\xef\xbb\xbf" + csv_with_units, ["A", "B", "C,D"]),
+            (read_ndjson, ndjson_with_units, ["A", "B", "C,D"]),
+            (read_ndjson, ndjson_without_units, ["0", "1", "2"]),
+        ],
+    )
+    def test_text(self, reader, content, units):
+
+        pool, characteristics = reader(io.BytesIO(content))
+
+        assert pool.tolist() == units
+        np.testing.assert_array_equal(characteristics, expected)
+
+    @pytest.mark.parametrize(
+        "with_units, units",
+        [
+            (True, ["A", "B", "C,D"]),
+            (False, ["0", "1", "2"]),
+        ],
+    )
+    def test_parquet(self, with_units, units):
+
+        pool, characteristics = read_parquet(parquet(with_units))
+
+        assert pool.tolist() == units
+        np.testing.assert_array_equal(characteristics, expected)
+
+    def test_csv_keeps_upload_open(self):
+
+        file = io.BytesIO(csv_with_units)
+        read_csv(file)
+
+        assert not file.closed
+
+    @pytest.mark.parametrize(
+        "content, message",
+        [
+            (b'[1, 2]\n', "Line 1 is not an object."),
+            (b'{"unit": "A", "a": 1}\n5\n', "Line 2 is not an object."),
+            (b'{"unit": "A", "a": 1}\n{"unit": "B"}\n', "Missing characteristic"),
+            (b'{"unit": "A", "a": 1}\n{"unit": "B", "a": 1\n', "Invalid JSON on line 2"),
+            (b'{"unit": "A", "a": "x"}\n', "Invalid characteristics value"),
+            (b"", "The uploaded file is empty."),
+        ],
+    )
+    def test_ndjson_failure(self, content, message):
+
+        with pytest.raises(UploadError, match=message):
+            read_ndjson(io.BytesIO(content))
+
+    def test_csv_failure(self):
+
+        with pytest.raises(UploadError, match="Invalid characteristics value"):
+            read_csv(io.BytesIO(b"unit,a\nA,x\n"))
+
+
+class TestUpload:
+
+    @pytest.mark.parametrize(
+        "filename, content_type, format, expected",
+        [
+            ("units.csv", None, None, "csv"),
+            ("units.JSONL", None, None, "ndjson"),
+            ("units.bin", "application/x-ndjson; charset=utf-8", None, "ndjson"),
+            ("units.csv", "application/octet-stream", None, "csv"),
+            ("units.pq", None, None, "parquet"),
+            ("units.csv", "text/csv", "parquet", "parquet"),
+        ],
+    )
+    def test_detect_format(self, filename, content_type, format, expected):
+
+        assert detect_format(filename, content_type, format) == expected
+
+    @pytest.mark.parametrize(
+        "filename, content_type, format",
+        [
+            ("units.txt", "application/octet-stream", None),
+            (None, None, None),
+            ("units.csv", None, "xlsx"),
+        ],
+    )
+    def test_detect_format_failure(self, filename, content_type, format):
+
+        with pytest.raises(UploadError) as e:
+            detect_format(filename, content_type, format)
+
+        assert e.value.type == "UNSUPPORTED FORMAT"
+
+    def test_check_size(self):
+
+        file = io.BytesIO(csv_with_units)
+        file.seek(5)
+
+        assert check_size(file, max_bytes=len(csv_with_units)) == len(csv_with_units)
+        assert file.tell() == 0
+
+        with pytest.raises(UploadError) as e:
+            check_size(file, max_bytes=len(csv_with_units) - 1)
+
+        assert e.value.type == "UPLOAD TOO LARGE"
+
+    def test_max_pool_size(self):
+
+        pool, _ = read_upload(io.BytesIO(csv_with_units), "csv", max_pool_size=3)
+        assert len(pool) == 3
+
+        with pytest.raises(UploadError) as e:
+            read_upload(io.BytesIO(csv_with_units), "csv", max_pool_size=2)
+
+        assert e.value.type == "OUT OF FREE TIER"
+        assert e.value.ctx == {"maxSize": {"pool": 2}}
+
+    @pytest.mark.parametrize(
+        "format, content",
+        [
+            ("csv", b"unit,a\nA,nan\nB,1\nC,2\n"),
+            ("csv", b"unit,a\nA,inf\nB,1\n"),
+            ("ndjson", b'{"unit": "A", "a": null}\n{"unit": "B", "a": 1}\n'),
+        ],
+    )
+    def test_non_finite(self, format, content):
+
+        with pytest.raises(UploadError, match="non-finite"):
+            read_upload(io.BytesIO(content), format)
+
+    def test_parquet_nulls(self):
+
+        pa = pytest.importorskip("pyarrow")
+        pq = pytest.importorskip("pyarrow.parquet")
+
+        file = io.BytesIO()
+        pq.write_table(pa.table({"unit": ["A", "B"], "a": [1.0, None]}), file)
+        file.seek(0)
+
+        with pytest.raises(UploadError, match="non-finite"):
+            read_upload(file, "parquet")
+
+    @pytest.mark.parametrize(
+        "format, content",
+        [
+            ("csv", b"unit,a\nA,1\nB,2\nA,3\n"),
+            ("ndjson", b'{"unit": 1, "a": 1}\n{"unit": "1", "a": 2}\n'),
+        ],
+    )
+    def test_duplicate_units(self, format, content):
+
+        with pytest.raises(UploadError, match="not unique"):
+            read_upload(io.BytesIO(content), format)
@@ -0,0 +1,146 @@
+import orjson
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("multipart")
+pytest.importorskip("httpx")
+pytest.importorskip("surquest.fastapi")
+
+from fastapi.testclient import TestClient
+from surquest.utils.split_balancer.metrics import add_hook, remove_hook
+import app.main as main
+
+
+client = TestClient(main.app)
+
+csv = "unit,a,b\n" + "\n".join(f"u{i},{i % 7},{i % 5}" for i in range(30))
+
+
+class TestApp:
+
+    def test_split_columnar(self):
+
+        response = client.post(
+            "/balancer/split",
+            params={"layout": "columnar"},
+            json={
+                "pool": list(range(10)),
+                "characteristics": [[4, 5, 6, 4, 6, 9, 1, 4, 6, 5]],
+                "targetGroupSize": 5,
+                "controlGroupSize": 3,
+                "inTargetGroup": [0, 1],
+                "inControlGroup": [9],
+                "outTargetGroup": None,
+                "outControlGroup": None,
+            }
+        )
+
+        assert response.status_code == 200
+
+        assignments = orjson.loads(response.content)["data"]["assignments"]
+
+        assert assignments["units"] == list(range(10))
+        assert assignments["groups"] == ["target", "control", "unassigned"]
+        assert assignments["group"].count(0) == 5
+        assert assignments["group"].count(1) == 3
+        assert assignments["group"][0] == 0 and assignments["group"][1] == 0
+        assert assignments["group"][9] == 1
+
+    def test_split_upload(self):
+
+        response = client.post(
+            "/balancer/split/upload",
+            files={"file": ("units.csv", csv, "text/csv")},
+            data={"targetGroupSize": "10", "controlGroupSize": "5", "inTargetGroup": ["u1", "u2"]}
+        )
+
+        assert response.status_code == 200
+
+        data = orjson.loads(response.content)["data"]
+        assignments = data["assignments"]
+
+        assert assignments["units"] == [f"u{i}" for i in range(30)]
+        assert assignments["group"].count(0) == 10
+        assert assignments["group"].count(1) == 5
+        assert assignments["group"][1] == 0 and assignments["group"][2] == 0
+        assert len(data["stats"]["characteristics"]) == 2
+
+    @pytest.mark.parametrize(
+        "filename, content, content_type",
+        [
+            ("units.csv", "unit,a\nA,nan\nB,1\nC,2\n", "text/csv"),
+            ("units.ndjson", "[1, 2]\n", "application/x-ndjson"),
+            ("units.txt", "unit,a\nA,1\n", "text/plain"),
+        ],
+    )
+    def test_split_upload_failure(self, filename, content, content_type):
+
+        response = client.post(
+            "/balancer/split/upload",
+            files={"file": (filename, content, content_type)},
+            data={"targetGroupSize": "1", "controlGroupSize": "1"}
+        )
+
+        assert response.status_code == 422
+        assert orjson.loads(response.content)["info"]["errors"][0]["loc"] == ["body", "file"]
+
+    def test_split_upload_content_length(self, monkeypatch):
+
+        monkeypatch.setattr(main, "MAX_UPLOAD_BYTES", 10)
+        monkeypatch.setattr(main, "MAX_UPLOAD_FORM_OVERHEAD", 0)
+
+        response = client.post(
+            "/balancer/split/upload",
+            files={"file": ("units.csv", csv, "text/csv")},
+            data={"targetGroupSize": "10", "controlGroupSize": "5"}
+        )
+
+        assert response.status_code == 413
+        assert orjson.loads(response.content)["info"]["errors"][0]["type"] == "UPLOAD TOO LARGE"
+
+    @pytest.mark.parametrize(
+        "data, loc, type",
+        [
+            ({"targetGroupSize": "10", "controlGroupSize": "5", "inTargetGroup": ["nope"]}, ["body", "inTargetGroup"], "UNKNOWN UNITS"),
+            ({"targetGroupSize": "10", "controlGroupSize": "5", "outControlGroup": ["u1", "x"]}, ["body", "outControlGroup"], "UNKNOWN UNITS"),
+            ({"targetGroupSize": "40", "controlGroupSize": "5"}, ["body"], "INVALID SPLIT"),
+            ({"targetGroupSize": "10", "controlGroupSize": "30"}, ["body"], "INVALID SPLIT"),
+            ({"targetGroupSize": "10", "controlGroupSize": "5", "inTargetGroup": ["u1"], "inControlGroup": ["u1"]}, ["body", "inControlGroup"], "INVALID SPLIT"),
+            ({"targetGroupSize": "10", "controlGroupSize": "5", "inTargetGroup": ["u1"], "outTargetGroup": ["u1"]}, ["body", "outTargetGroup"], "INVALID SPLIT"),
+        ],
+    )
+    def test_split_upload_invalid_split(self, data, loc, type):
+
+        response = client.post(
+            "/balancer/split/upload",
+            files={"file": ("units.csv", csv, "text/csv")},
+            data=data
+        )
+
+        assert response.status_code == 422
+
+        error = orjson.loads(response.content)["info"]["errors"][0]
+        assert error["loc"] == loc
+        assert error["type"] == type
+
+    def test_count_requests(self):
+
+        events = []
+
+        def hook(event, **data):
+            events.append(event)
+
+        add_hook(hook)
+        try:
+            client.get("/metrics")
+            client.post(
+                "/balancer/split/upload",
+                files={"file": ("units.csv", csv, "text/csv")},
+                data={"targetGroupSize": "10", "controlGroupSize": "5"}
+            )
+        finally:
+            remove_hook(hook)
+
+        assert events[0] == "request_start" and events[-1] == "request_end"
+        assert events.count("request_start") == 1
+        assert "split_balancer_requests_in_progress 0" in client.get("/metrics").text
@@ -0,0 +1,62 @@
+import numpy as np
+import orjson
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("surquest.fastapi")
+
+from app.serialization import NumpyJSONResponse, set_response, to_columnar
+
+
+class TestSerialization:
+
+    @pytest.mark.parametrize(
+        "content, expected",
+        [
+            ({"value": np.float64(1.5), "count": np.int64(3), "flag": np.bool_(True)}, {"value": 1.5, "count": 3, "flag": True}),
+            ({"units": np.array(["A", "B"])}, {"units": ["A", "B"]}),
+            ({"units": [np.str_("A"), np.str_("B")]}, {"units": ["A", "B"]}),
+            ({"column": np.arange(12).reshape(3, 4)[:, 1]}, {"column": [1, 5, 9]}),
+            ({"matrix": np.arange(6, dtype=np.float64).reshape(2, 3).T}, {"matrix": [[0.0, 3.0], [1.0, 4.0], [2.0, 5.0]]}),
+            ({"pool": range(3)}, {"pool": [0, 1, 2]}),
+            ({1: "a"}, {"1": "a"}),
+        ],
+    )
+    def test_render(self, content, expected):
+
+        assert orjson.loads(NumpyJSONResponse(content).body) == expected
+
+    def test_render_failure(self):
+
+        with pytest.raises(TypeError):
+            NumpyJSONResponse({"value": object()})
+
+    def test_set_response(self):
+
+        response = set_response({"value": np.float64(0.5)})
+
+        assert response.status_code == 200
+        assert response.media_type == "application/json"
+        assert orjson.loads(response.body) == {
+            "info": {"status": "success", "metadata": None},
+            "data": {"value": 0.5}
+        }
+
+    @pytest.mark.parametrize(
+        "pool",
+        [
+            [1, 2, 3, 4],
+            np.array(["1", "2", "3", "4"]),
+        ],
+    )
+    def test_to_columnar(self, pool):
+
+        units = list(pool)
+        assignments = {"target": [units[2], units[0]], "control": [units[3]], "unassigned": [units[1]]}
+
+        columnar = to_columnar(pool, assignments)
+
+        assert columnar["groups"] == ["target", "control", "unassigned"]
+        assert list(columnar["units"]) == units
+        assert columnar["group"].dtype == np.int8
+        assert columnar["group"].tolist() == [0, 2, 0, 1]
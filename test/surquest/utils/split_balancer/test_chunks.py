@@ -0,0 +1,151 @@
+import os
+import subprocess
+import sys
+import numpy as np
+import pytest
+from surquest.utils.split_balancer import SplitBalancer
+from surquest.utils.split_balancer.chunks import NpyReader, as_chunked, iter_chunks, simplify, weighted_sums
+from surquest.utils.split_balancer.errors import InvalidChunkSizeError
+
+
+rng = np.random.default_rng(0)
+matrix = rng.integers(0, 100, size=(3, 1000)).astype(np.float64)
+
+
+def simplify_in_memory(characteristics):
+    """Reference implementation standardizing the whole matrix in memory."""
+
+    matrix = np.array(characteristics)
+    std_matrix = (matrix - matrix.min()) / (matrix.max() - matrix.min())
+
+    return np.mean(std_matrix, axis=0)
+
+
+def peak_rss(code):
+    """Run the code in a fresh interpreter and return its peak RSS growth in MiB.
+
+    The peak is read from `VmHWM` of `/proc/self/status` (Linux), `ru_maxrss` would
+    include the peak of the forking pytest process.
+    """
+
+    code = (
+        "import numpy\n"
+        "from surquest.utils.split_balancer import chunks\n"
+        "def hwm():\n"
+        "    with open('/proc/self/status') as f:\n"
+        "        return next(int(line.split()[1]) for line in f if line.startswith('VmHWM'))\n"
+        "base = hwm()\n"
+        f"{code}\n"
+        "print((hwm() - base) / 1024)\n"
+    )
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    process = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, check=True)
+
+    return float(process.stdout.strip().splitlines()[-1])
+
+
+class TestChunks:
+
+    @pytest.mark.parametrize("chunk_size", [1, 7, 256, 1000, 5000])
+    def test_simplify(self, chunk_size):
+
+        np.testing.assert_allclose(
+            simplify(as_chunked(matrix.tolist()), chunk_size=chunk_size),
+            simplify_in_memory(matrix)
+        )
+
+    @pytest.mark.parametrize("fortran_order", [False, True])
+    def test_npy_reader(self, tmp_path, fortran_order):
+
+        path = tmp_path / "characteristics.npy"
+        np.save(path, np.asfortranarray(matrix) if fortran_order else matrix)
+
+        reader = as_chunked(str(path))
+
+        assert isinstance(reader, NpyReader)
+        assert reader.shape == matrix.shape
+        np.testing.assert_array_equal(reader[:, 10:20], matrix[:, 10:20])
+        np.testing.assert_array_equal(reader[1:, 995:2000], matrix[1:, 995:])
+        np.testing.assert_array_equal(reader[2], matrix[2])
+        np.testing.assert_array_equal(reader[-1], matrix[-1])
+        np.testing.assert_array_equal(reader[np.int64(-3), 5:9], matrix[0, 5:9])
+        np.testing.assert_array_equal(reader[np.int64(1)], matrix[1])
+        np.testing.assert_allclose(simplify(reader, chunk_size=128), simplify_in_memory(matrix))
+
+    @pytest.mark.parametrize("row", [3, -4])
+    def test_npy_reader_out_of_bounds(self, tmp_path, row):
+
+        path = tmp_path / "characteristics.npy"
+        np.save(path, matrix)
+
+        with pytest.raises(IndexError):
+            NpyReader(path)[row]
+
+    @pytest.mark.parametrize("chunk_size", [0, -1, 1.5, True])
+    def test_invalid_chunk_size(self, chunk_size):
+
+        with pytest.raises(ValueError):
+            next(iter_chunks(matrix, chunk_size))
+
+        with pytest.raises(InvalidChunkSizeError):
+            SplitBalancer(
+                pool=range(50),
+                characteristics=matrix[:, :50].tolist(),
+                target_group_size=30,
+                control_group_size=10,
+                chunk_size=chunk_size
+            )
+
+    def test_weighted_sums(self, tmp_path):
+
+        path = tmp_path / "characteristics.npy"
+        np.save(path, matrix)
+
+        weights = {"target": rng.integers(0, 2, 1000), "control": rng.integers(0, 2, 1000)}
+        sums = weighted_sums(np.load(path, mmap_mode="r"), weights, chunk_size=100)
+
+        for key, vector in weights.items():
+            np.testing.assert_allclose(sums[key], matrix @ vector)
+
+    def test_split_balancer(self, tmp_path):
+
+        path = tmp_path / "characteristics.npy"
+        np.save(path, matrix[:, :50])
+
+        results = {}
+        for characteristics in [matrix[:, :50].tolist(), path]:
+
+            split_balancer = SplitBalancer(
+                pool=range(50),
+                characteristics=characteristics,
+                target_group_size=30,
+                control_group_size=10,
+                chunk_size=16
+            )
+
+            results[type(characteristics)] = split_balancer.solve()
+
+        stats = [result["stats"] for result in results.values()]
+        assert stats[0]["total"]["objectiveFunction"] == pytest.approx(stats[1]["total"]["objectiveFunction"])
+
+    @pytest.mark.skipif(not os.path.exists("/proc/self/status"), reason="Peak RSS is read from /proc")
+    def test_peak_rss(self, tmp_path):
+
+        path = tmp_path / "characteristics.npy"
+        shape = (50, 200_000)
+        size = shape[0]*shape[1]*8/2**20
+
+        out = np.lib.format.open_memmap(path, mode="w+", dtype=np.float64, shape=shape)
+        for row in range(shape[0]):
+            out[row] = rng.random(shape[1])
+        out.flush()
+        del out
+
+        chunked = peak_rss(f"chunks.simplify(chunks.as_chunked({str(path)!r}), chunk_size=8192)")
+        in_memory = peak_rss(
+            f"m = numpy.load({str(path)!r}); s = ((m - m.min()) / (m.max() - m.min())).mean(axis=0)"
+        )
+
+        print(f":> matrix {size:.0f} MiB - peak RSS chunked {chunked:.0f} MiB - in memory {in_memory:.0f} MiB")
+
+        assert chunked < size / 4
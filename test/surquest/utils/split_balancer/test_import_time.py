@@ -0,0 +1,63 @@
+import os
+import re
+import subprocess
+import sys
+import pytest
+
+
+# Budget for the cumulative import time of the package in microseconds
+IMPORT_TIME_BUDGET_US = 100_000
+
+# Heavy modules which must be loaded on first use only
+LAZY_MODULES = ["ortools", "numpy", "requests"]
+
+
+def import_time(module):
+    """Import the module in a fresh interpreter with `-X importtime`.
+
+    Returns:
+        tuple: The cumulative import time of the module in microseconds and the loaded top-level modules.
+    """
+
+    code = f"import sys, {module}; print(','.join(sorted({{m.split('.')[0] for m in sys.modules}})))"
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, env=env, check=True
+    )
+
+    cumulative = None
+    for line in process.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \| (\s*)(\S+)", line)
+        if match and match.group(3) == module:
+            cumulative = int(match.group(1))
+
+    return cumulative, process.stdout.strip().split(",")
+
+
+class TestImportTime:
+
+    @pytest.mark.parametrize(
+        "module",
+        [
+            "surquest.utils.split_balancer",
+            "surquest.utils.split_balancer.errors",
+        ],
+    )
+    def test_lazy_modules(self, module):
+
+        _, modules = import_time(module)
+
+        for lazy in LAZY_MODULES:
+            assert lazy not in modules, f"Module {lazy} is imported by {module}"
+
+    def test_budget(self):
+
+        cumulative, _ = import_time("surquest.utils.split_balancer")
+
+        print(f":> import time {cumulative} us (budget {IMPORT_TIME_BUDGET_US} us)")
+
+        assert cumulative is not None
+        assert cumulative < IMPORT_TIME_BUDGET_US, \
+            f"Import took {cumulative} us, budget is {IMPORT_TIME_BUDGET_US} us"
@@ -0,0 +1,160 @@
+import numpy as np
+import pytest
+from surquest.utils.split_balancer import SplitBalancer
+from surquest.utils.split_balancer.errors import *
+from surquest.utils.split_balancer.metrics import Metrics, add_hook, remove_hook
+
+
+pool = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10]
+characteristics = [
+    [4, 5, 6, 4, 6, 9, 1, 4, 6, 5],
+    [2, 3, 4, 2, 4, 7, 1, 2, 4, 3]
+]
+
+
+@pytest.fixture
+def metrics():
+
+    metrics = Metrics()
+    add_hook(metrics)
+    yield metrics
+    remove_hook(metrics)
+
+
+class TestMetrics:
+
+    def test_success(self, metrics):
+
+        SplitBalancer(
+            pool=pool,
+            characteristics=characteristics,
+            target_group_size=5,
+            control_group_size=3
+        ).solve()
+
+        text = metrics.render()
+
+        assert metrics.in_progress == 0
+        assert sum(metrics.terminations.values()) == 1
+        assert list(metrics.terminations)[0][0] in ("OPTIMAL", "FEASIBLE")
+        assert 'split_balancer_build_seconds_count{pool_size="10"} 1' in text
+        assert 'split_balancer_solve_seconds_bucket{pool_size="10",le="+Inf"} 1' in text
+        assert 'split_balancer_objective_value{pool_size="10"}' in text
+        assert "split_balancer_in_progress 0" in text
+
+    def test_no_optimal_solution(self, metrics):
+
+        split_balancer = SplitBalancer(
+            pool=pool,
+            characteristics=characteristics,
+            target_group_size=5,
+            control_group_size=3,
+            in_target_group=[1, 2, 3],
+            in_control_group=[7, 8, 9, 10]
+        )
+
+        with pytest.raises(NoOptimalSolutionError):
+            split_balancer.solve()
+
+        text = metrics.render()
+
+        assert metrics.in_progress == 0
+        assert 'split_balancer_errors_total{error="NoOptimalSolutionError"} 1' in text
+        assert 'split_balancer_terminations_total{reason="INFEASIBLE",limit="",timeout="false"} 1' in text
+
+    def test_timeout(self, metrics):
+
+        rng = np.random.default_rng(0)
+        split_balancer = SplitBalancer(
+            pool=range(1000),
+            characteristics=rng.random((2, 1000)).tolist(),
+            target_group_size=400,
+            control_group_size=300
+        )
+
+        with pytest.raises(NoOptimalSolutionError):
+            split_balancer.solve(limit=0.001)
+
+        text = metrics.render()
+
+        assert 'split_balancer_terminations_total{reason="NO_SOLUTION_FOUND",limit="UNDETERMINED",timeout="true"} 1' in text
+        assert 'split_balancer_errors_total{error="NoOptimalSolutionError"} 1' in text
+
+    @pytest.mark.parametrize(
+        "reason, limit, timeout",
+        [
+            ("OPTIMAL", None, "false"),
+            ("INFEASIBLE", None, "false"),
+            ("FEASIBLE", "UNDETERMINED", "true"),
+            ("FEASIBLE", "TIME", "true"),
+            ("NO_SOLUTION_FOUND", "UNDETERMINED", "true"),
+        ],
+    )
+    def test_timeout_label(self, reason, limit, timeout):
+
+        metrics = Metrics()
+        metrics("solve", pool_size=10, duration=1, reason=reason, limit=limit, objective=None)
+
+        assert f'split_balancer_terminations_total{{reason="{reason}",limit="{limit or ""}",timeout="{timeout}"}} 1' in metrics.render()
+
+    def test_other_error(self, metrics):
+
+        split_balancer = SplitBalancer(
+            pool=pool,
+            characteristics=characteristics,
+            target_group_size=5,
+            control_group_size=3,
+            in_target_group=[11]
+        )
+
+        with pytest.raises(KeyError):
+            split_balancer.solve()
+
+        assert metrics.in_progress == 0
+        assert 'split_balancer_errors_total{error="KeyError"} 1' in metrics.render()
+
+    def test_failing_hook(self, metrics, caplog):
+
+        def hook(event, **data):
+            raise RuntimeError("broken hook")
+
+        add_hook(hook)
+        try:
+            result = SplitBalancer(
+                pool=pool,
+                characteristics=characteristics,
+                target_group_size=5,
+                control_group_size=3
+            ).solve()
+        finally:
+            remove_hook(hook)
+
+        assert len(result["assignments"]["target"]) == 5
+        assert sum(metrics.terminations.values()) == 1
+        assert "broken hook" in caplog.text
+
+    def test_queued(self):
+
+        metrics = Metrics()
+        for event in ["request_start", "request_start", "request_start", "start"]:
+            metrics(event, pool_size=10)
+
+        text = metrics.render()
+
+        assert "split_balancer_in_progress 1" in text
+        assert "split_balancer_requests_in_progress 3" in text
+        assert "split_balancer_queued 2" in text
+
+    @pytest.mark.parametrize(
+        "pool_size, expected",
+        [
+            (2, "10"),
+            (10, "10"),
+            (11, "100"),
+            (100000, "100000"),
+            (100001, "+Inf"),
+        ],
+    )
+    def test_pool_size_bucket(self, pool_size, expected):
+
+        assert Metrics.pool_size_bucket(pool_size) == expected
@@ -1,6 +1,9 @@
+import os
+import subprocess
+import sys
+import numpy as np
 import pytest
 import random
-import time
 from surquest.utils.split_balancer import SplitBalancer
 from surquest.utils.split_balancer.errors import *
 
@@ -32,6 +35,29 @@ characteristics["big"] = [
 big_target_group_size = int(0.8*big_N)
 big_control_group_size = int(0.1*big_N)
 
+
+def benchmark(code):
+    """Run the code in a fresh interpreter and return its printed duration and peak RSS growth.
+
+    As in `test_chunks.peak_rss`, the peak is read from `VmHWM` of `/proc/self/status` (Linux)
+    so that every case is measured on its own.
+    """
+
+    code = (
+        "import time\n"
+        "import numpy\n"
+        "def hwm():\n"
+        "    with open('/proc/self/status') as f:\n"
+        "        return next(int(line.split()[1]) for line in f if line.startswith('VmHWM'))\n"
+        f"{code}"
+    )
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    process = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, check=True)
+
+    duration, rss = process.stdout.strip().splitlines()[-1].split()
+
+    return float(duration), float(rss)
+
 class TestSplitBalancer:
 
 
@@ -118,40 +144,76 @@ class TestSplitBalancer:
             for unit in out_control_group:
                 assert unit not in groups["control"], f"Unit {unit} is in the control group: {groups['control']}"
 
-    def test_benchmark(self):
-
-        for i in [10, 100, 500, 1000, 2500, 5000]: # 500, 1000, 1500, 2500, 5000
-            for j in [1, 2, 5, 10, 50]: # [1, 5, 10, 50]:
-
-                n = i
-                pool = range(n)
-                characteristics = []
-                for x in range(j):
-                    characteristics.append(
-                        [random.randrange(0, 10000) for _ in range(n)]
-                        )
-                        
-                target_group_size = int(0.6*n)
-                control_group_size = int(0.2*n)
-                in_target_group = None
-                in_control_group = None
-                out_target_group = None
-                out_control_group = None
-
-                split_balancer = SplitBalancer(
-                    pool=pool,
-                    characteristics=characteristics,
-                    target_group_size=target_group_size,
-                    control_group_size=control_group_size,
-                    in_target_group=in_target_group,
-                    in_control_group=in_control_group,
-                    out_target_group=out_target_group,
-                    out_control_group=out_control_group
-                )
-
-                start = time.time()
-                split_balancer.solve()
-                end = time.time()
-
-                print(f":> {i} - {j} - time {end-start}")
-                print("-"*150)
\ No newline at end of file
+    @pytest.mark.parametrize(
+        "target_group_size, control_group_size, in_target_group, in_control_group, characteristics, optimum",
+        [
+            (target_group_size, control_group_size, in_target_group, in_control_group, characteristics.get(1), (0, 0)),
+            (target_group_size, control_group_size, in_target_group, in_control_group, characteristics.get(2), (0, 0)),
+            (target_group_size, control_group_size, None, None, [[1, 1, 1, 2, 2, 2, 3, 3, 3, 4]], (0, 0)),
+            (6, 4, None, None, characteristics.get(2), (0.0208333, 1250)),
+            # Pre-assignments force a gap between the group means
+            (2, 2, [10], None, [[0, 0, 0, 0, 0, 0, 0, 0, 0, 2]], (0.5, 10000)),
+            (1, 4, [6], [1, 7, 9], [[0, 1, 2, 3, 4, 5, 1, 2, 3, 3]], (0.6, 10000)),
+            (3, 3, [3, 6], [1, 7], characteristics.get(2), (0.2916667, 8750)),
+        ],
+    )
+    @pytest.mark.parametrize("integer_only", [False, True])
+    def test_strengthen(self, target_group_size, control_group_size, in_target_group, in_control_group, characteristics, optimum, integer_only):
+
+        results = {}
+        for strengthen in [False, True]:
+
+            split_balancer = SplitBalancer(
+                pool=pool,
+                characteristics=characteristics,
+                target_group_size=target_group_size,
+                control_group_size=control_group_size,
+                in_target_group=in_target_group,
+                in_control_group=in_control_group
+            )
+
+            results[strengthen] = split_balancer.solve(integer_only=integer_only, strengthen=strengthen)
+
+        # The strengthened model has the same optimum as the plain one
+        assert results[False]["stats"]["total"]["objectiveFunction"] == pytest.approx(optimum[integer_only], abs=1e-6)
+        assert results[True]["stats"]["total"]["objectiveFunction"] \
+            == pytest.approx(results[False]["stats"]["total"]["objectiveFunction"])
+
+        groups = results[True].get("assignments")
+        assert target_group_size == len(groups["target"])
+        assert control_group_size == len(groups["control"])
+
+        for unit in in_target_group or []:
+            assert unit in groups["target"], f"Unit {unit} is not in the target group: {groups['target']}"
+
+        for unit in in_control_group or []:
+            assert unit in groups["control"], f"Unit {unit} is not in the control group: {groups['control']}"
+
+    @pytest.mark.skipif(not os.path.exists("/proc/self/status"), reason="Peak RSS is read from /proc")
+    def test_benchmark(self, tmp_path):
+
+        cases = [(i, j, "list") for i in [10, 100, 500, 1000, 2500, 5000] for j in [1, 2, 5, 10, 50]]
+        cases += [(i, 10, "npy") for i in [1000, 5000]]
+
+        for i, j, source in cases:
+
+            n = i
+            characteristics = f"numpy.random.default_rng({i*j}).integers(0, 10000, size=({j}, {n})).tolist()"
+
+            if source == "npy":
+                path = tmp_path / f"characteristics_{i}_{j}.npy"
+                np.save(path, np.random.default_rng(i*j).integers(0, 10000, size=(j, n)))
+                characteristics = f"{str(path)!r}"
+
+            duration, rss = benchmark(
+                "from surquest.utils.split_balancer import SplitBalancer\n"
+                f"characteristics = {characteristics}\n"
+                "base = hwm()\n"
+                "start = time.time()\n"
+                f"SplitBalancer(pool=range({n}), characteristics=characteristics, "
+                f"target_group_size={int(0.6*n)}, control_group_size={int(0.2*n)}).solve()\n"
+                "print(time.time() - start, (hwm() - base) / 1024)\n"
+            )
+
+            print(f":> {i} - {j} - {source} - time {duration} - peak RSS growth {rss:.0f} MiB")
+            print("-"*150)